@@ -4,22 +4,31 @@ Voice-First Spiritual/Biohacking Oracle
 """
 import os
 import io
+import time
 import random
 import asyncio
+import re
+import hashlib
+import concurrent.futures
+import multiprocessing
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List, Dict, Any
 from contextlib import asynccontextmanager
+from functools import lru_cache
 import base64
 
 from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field
+from anyio.to_thread import current_default_thread_limiter
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 from jose import jwt, JWTError
 import bcrypt
+import numpy as np
+from cachetools import TTLCache
 
 load_dotenv()
 
@@ -33,9 +42,11 @@ STRIPE_API_KEY = os.environ.get("STRIPE_API_KEY")
 JWT_SECRET = os.environ.get("JWT_SECRET")
 if not JWT_SECRET:
     raise ValueError("JWT_SECRET environment variable is required")
+# Comma-separated list of origins allowed to call the API from a browser
+FRONTEND_ORIGINS = [o.strip() for o in os.environ.get("FRONTEND_ORIGIN", "http://localhost:3000").split(",") if o.strip()]
 
 # MongoDB setup
-client = MongoClient(MONGO_URL)
+client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
 
 # Collections
@@ -46,9 +57,6 @@ community_posts_collection = db["community_posts"]
 payment_transactions_collection = db["payment_transactions"]
 chat_history_collection = db["chat_history"]
 
-# Create indexes
-users_collection.create_index("email", unique=True)
-
 # Import integrations
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 from emergentintegrations.llm.openai import OpenAITextToSpeech, OpenAISpeechToText
@@ -56,20 +64,63 @@ from emergentintegrations.payments.stripe.checkout import (
     StripeCheckout, CheckoutSessionRequest, CheckoutSessionResponse, CheckoutStatusResponse
 )
 
+# Shared SDK clients. LlmChat stays per request since it carries the
+# session id and system prompt.
+tts = OpenAITextToSpeech(api_key=EMERGENT_LLM_KEY)
+stt = OpenAISpeechToText(api_key=EMERGENT_LLM_KEY)
+
+@lru_cache(maxsize=8)
+def get_stripe(webhook_url: str) -> StripeCheckout:
+    """One StripeCheckout per webhook URL (in practice one per public base URL)"""
+    return StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+
+# Cap for AnyIO's worker threads (default 40), which run sync handlers and
+# spooled upload I/O; raised so slow calls don't queue behind each other on spikes
+WORKER_THREAD_LIMIT = 200
+
+# Process pool for bcrypt hashing so login bursts use every core without
+# blocking the event loop; created in lifespan
+bcrypt_pool: Optional[concurrent.futures.Executor] = None
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global bcrypt_pool, chat_log_queue
     print("🐉 Dr Ethergreen – YKY Hub Starting...")
+    current_default_thread_limiter().total_tokens = WORKER_THREAD_LIMIT
+    # spawn rather than fork: the parent already runs the event loop and Motor's threads
+    bcrypt_pool = concurrent.futures.ProcessPoolExecutor(
+        max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+    )
+    await users_collection.create_index("email", unique=True)
+    # Indexes backing the history/feed sorts and payment lookups
+    await tarot_readings_collection.create_index([("user_id", 1), ("created_at", -1)])
+    await community_posts_collection.create_index([("category", 1), ("created_at", -1)])
+    await community_posts_collection.create_index([("created_at", -1)])
+    await payment_transactions_collection.create_index("session_id", unique=True)
+    await chat_history_collection.create_index([("user_id", 1), ("created_at", -1)])
+    await bio_scans_collection.create_index([("user_id", 1), ("created_at", -1)])
+    chat_log_queue = asyncio.Queue(maxsize=CHAT_LOG_QUEUE_SIZE)
+    chat_log_flusher = asyncio.create_task(flush_chat_log())
     yield
+    # Let the writer finish its current batch rather than cancelling it mid-insert
+    await chat_log_queue.put(CHAT_LOG_STOP)
+    await chat_log_flusher
+    while not chat_log_queue.empty():
+        await write_chat_log_batch(drain_chat_log())
+    # Pending fire-and-forget writes (bio scans) need Mongo, so let them land first
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    bcrypt_pool.shutdown(wait=False)
+    client.close()
     print("🌙 Shutting down gracefully...")
 
-app = FastAPI(title="Dr Ethergreen – YKY Hub", lifespan=lifespan)
+app = FastAPI(title="Dr Ethergreen – YKY Hub", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=FRONTEND_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT"],
+    allow_headers=["authorization", "content-type"],
 )
 
 # ======================== MODELS ========================
@@ -114,18 +165,88 @@ class CheckoutRequest(BaseModel):
     package_id: str
     origin_url: str
 
+# ======================== BACKGROUND TASKS ========================
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks = set()
+
+def run_in_background(coro):
+    """Schedule a coroutine that the response doesn't need to wait for"""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+# Oracle chat history is queued and written in batches by flush_chat_log
+# rather than one insert per message; the queue is created in lifespan
+CHAT_LOG_QUEUE_SIZE = 10000
+CHAT_LOG_BATCH_SIZE = 200
+chat_log_queue: Optional[asyncio.Queue] = None
+chat_log_dropped = 0
+# Queued by lifespan on shutdown; flush_chat_log exits once it has written everything ahead of it
+CHAT_LOG_STOP = object()
+
+def enqueue_chat_log(entry: dict):
+    """Queue a chat history entry, dropping it if the writer has fallen too far behind"""
+    global chat_log_dropped
+    try:
+        chat_log_queue.put_nowait(entry)
+    except asyncio.QueueFull:
+        if not chat_log_dropped:
+            print(f"⚠️ Chat history queue full ({CHAT_LOG_QUEUE_SIZE}), dropping entries until the writer catches up")
+        chat_log_dropped += 1
+
+def drain_chat_log(batch: Optional[List[dict]] = None) -> List[dict]:
+    """Top a batch up to CHAT_LOG_BATCH_SIZE from whatever is already queued"""
+    batch = batch if batch is not None else []
+    while len(batch) < CHAT_LOG_BATCH_SIZE and not chat_log_queue.empty():
+        batch.append(chat_log_queue.get_nowait())
+    return batch
+
+async def write_chat_log_batch(batch: List[dict]):
+    if not batch:
+        return
+    try:
+        await chat_history_collection.insert_many(batch, ordered=False)
+    except Exception as e:
+        print(f"⚠️ Failed to write {len(batch)} chat history entries: {e}")
+
+async def write_bio_scan(scan: dict):
+    try:
+        await bio_scans_collection.insert_one(scan)
+    except Exception as e:
+        print(f"⚠️ Failed to write bio scan for user {scan.get('user_id')}: {e}")
+
+async def flush_chat_log():
+    """Write queued chat history; whatever piles up during one write goes out in the next batch"""
+    global chat_log_dropped
+    while True:
+        batch = drain_chat_log([await chat_log_queue.get()])
+        stop = any(entry is CHAT_LOG_STOP for entry in batch)
+        await write_chat_log_batch([entry for entry in batch if entry is not CHAT_LOG_STOP])
+        # Report drops once the backlog has cleared, so a burst logs two lines rather than one per entry
+        if chat_log_dropped and chat_log_queue.empty():
+            print(f"⚠️ Dropped {chat_log_dropped} chat history entries while the queue was full")
+            chat_log_dropped = 0
+        if stop:
+            return
+
 # ======================== AUTH HELPERS ========================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    hashed = await loop.run_in_executor(bcrypt_pool, bcrypt.hashpw, password.encode(), bcrypt.gensalt())
+    return hashed.decode()
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+async def verify_password(password: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_pool, bcrypt.checkpw, password.encode(), hashed.encode())
 
-def create_token(user_id: str, email: str) -> str:
+def create_token(user_id: str, email: str, name: str) -> str:
     payload = {
         "sub": user_id,
         "email": email,
+        "name": name,
         "exp": datetime.now(timezone.utc) + timedelta(days=30)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
@@ -136,27 +257,73 @@ def decode_token(token: str) -> dict:
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-async def get_current_user(authorization: str = Header(None)):
+# Verified bearer tokens -> (claims, expires_at) and (user, expires_at). Only
+# successful lookups are cached, so bad tokens always go through full validation.
+AUTH_CACHE_TTL = 30
+_claims_cache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL, timer=time.time)
+_auth_cache = TTLCache(maxsize=10000, ttl=AUTH_CACHE_TTL, timer=time.time)
+
+def invalidate_cached_user(user_id: str):
+    """Drop cached auth entries for a user after their document changes"""
+    for key, (cached_user, _) in list(_auth_cache.items()):
+        if cached_user["id"] == user_id:
+            _auth_cache.pop(key, None)
+
+def bearer_token(authorization: Optional[str]) -> str:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid authorization")
-    token = authorization.replace("Bearer ", "")
+    return authorization.replace("Bearer ", "")
+
+def verify_token(token: str) -> dict:
+    """decode_token, memoized per token until the cache TTL or the token's exp"""
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    cached = _claims_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+    
     payload = decode_token(token)
-    user = users_collection.find_one({"_id": ObjectId(payload["sub"])}, {"password": 0})
+    # Never let a cache entry outlive the token itself
+    _claims_cache[key] = (payload, min(now + AUTH_CACHE_TTL, payload["exp"]))
+    return payload
+
+async def get_token_claims(authorization: str = Header(None)) -> dict:
+    """Verified JWT claims, without touching the database"""
+    return verify_token(bearer_token(authorization))
+
+async def get_current_user_id(claims: dict = Depends(get_token_claims)) -> str:
+    """For routes that only need to know who is calling"""
+    return claims["sub"]
+
+async def get_current_user(authorization: str = Header(None)):
+    """The caller's full user document, for routes that return or depend on profile data"""
+    token = bearer_token(authorization)
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    cached = _auth_cache.get(key)
+    if cached and cached[1] > now:
+        return dict(cached[0])
+    
+    payload = verify_token(token)
+    user = await users_collection.find_one({"_id": ObjectId(payload["sub"])}, {"password": 0})
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    user["id"] = str(user.pop("_id"))
-    return user
+    # Keep the ObjectId alongside the string id so routes can query without re-parsing it
+    user["_oid"] = user.pop("_id")
+    user["id"] = str(user["_oid"])
+    _auth_cache[key] = (user, min(now + AUTH_CACHE_TTL, payload["exp"]))
+    return dict(user)
 
 # ======================== AUTH ROUTES ========================
 
 @app.post("/api/auth/register")
 async def register(user: UserCreate):
-    if users_collection.find_one({"email": user.email}):
+    if await users_collection.find_one({"email": user.email}, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     user_doc = {
         "email": user.email,
-        "password": hash_password(user.password),
+        "password": await hash_password(user.password),
         "name": user.name,
         "birth_date": user.birth_date,
         "birth_time": user.birth_time,
@@ -168,17 +335,20 @@ async def register(user: UserCreate):
         "numerology": {},
         "voice_pattern_id": None
     }
-    result = users_collection.insert_one(user_doc)
-    token = create_token(str(result.inserted_id), user.email)
+    result = await users_collection.insert_one(user_doc)
+    token = create_token(str(result.inserted_id), user.email, user.name)
     return {"token": token, "user": {"id": str(result.inserted_id), "email": user.email, "name": user.name, "is_premium": False}}
 
 @app.post("/api/auth/login")
 async def login(credentials: UserLogin):
-    user = users_collection.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    user = await users_collection.find_one(
+        {"email": credentials.email},
+        {"email": 1, "password": 1, "name": 1, "is_premium": 1}
+    )
+    if not user or not await verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    token = create_token(str(user["_id"]), user["email"])
+    token = create_token(str(user["_id"]), user["email"], user.get("name", ""))
     return {
         "token": token,
         "user": {
@@ -191,30 +361,44 @@ async def login(credentials: UserLogin):
 
 @app.get("/api/auth/me")
 async def get_me(user: dict = Depends(get_current_user)):
+    user.pop("_oid")
     return user
 
 # ======================== PROFILE ROUTES ========================
 
+def _digit_sum(n: int) -> int:
+    s = 0
+    while n:
+        s += n % 10
+        n //= 10
+    return s
+
+def life_path_number(birth_date: str) -> int:
+    """Reduce the birth date's digit sum to 1-9, keeping master numbers 11/22/33"""
+    life_path = _digit_sum(int(birth_date.replace("-", "")))
+    while life_path > 9 and life_path not in (11, 22, 33):
+        life_path = _digit_sum(life_path)
+    return life_path
+
 @app.put("/api/profile")
 async def update_profile(profile: UserProfile, user: dict = Depends(get_current_user)):
-    update_data = {k: v for k, v in profile.dict().items() if v is not None}
-    users_collection.update_one({"_id": ObjectId(user["id"])}, {"$set": update_data})
+    update_data = profile.model_dump(exclude_none=True)
+    await users_collection.update_one({"_id": user["_oid"]}, {"$set": update_data})
+    invalidate_cached_user(user["id"])
     return {"message": "Profile updated", "updated": update_data}
 
 @app.get("/api/profile/soulprint")
 async def get_soulprint(user: dict = Depends(get_current_user)):
     """Get the holographic soulprint - fusion of all systems"""
-    full_user = users_collection.find_one({"_id": ObjectId(user["id"])}, {"password": 0})
+    full_user = await users_collection.find_one(
+        {"_id": user["_oid"]},
+        {"_id": 0, "name": 1, "birth_date": 1, "human_design_type": 1, "gene_keys": 1, "numerology": 1, "is_premium": 1}
+    )
     
     # Calculate numerology from birth date if available
     numerology = full_user.get("numerology", {})
     if full_user.get("birth_date") and not numerology:
-        # Simple life path calculation
-        date_str = full_user["birth_date"].replace("-", "")
-        life_path = sum(int(d) for d in date_str)
-        while life_path > 9 and life_path not in [11, 22, 33]:
-            life_path = sum(int(d) for d in str(life_path))
-        numerology = {"life_path": life_path, "expression": random.randint(1, 9)}
+        numerology = {"life_path": life_path_number(full_user["birth_date"]), "expression": random.randint(1, 9)}
     
     return {
         "name": full_user.get("name"),
@@ -242,62 +426,94 @@ async def get_soulprint(user: dict = Depends(get_current_user)):
 
 # ======================== VOICE ORACLE ROUTES ========================
 
-@app.post("/api/oracle/chat")
-async def oracle_chat(message: OracleMessage, user: dict = Depends(get_current_user)):
-    """Chat with the Voice AI Oracle"""
-    try:
-        # Get user's profile for personalization
-        full_user = users_collection.find_one({"_id": ObjectId(user["id"])})
-        
-        system_prompt = f"""You are Dr. Ethergreen, the Voice Oracle of YKY Hub. You speak with a deep, resonant voice 
+# System prompts are built once; only the oracle chat template has per-user fields
+ORACLE_SYSTEM_TEMPLATE = """You are Dr. Ethergreen, the Voice Oracle of YKY Hub. You speak with a deep, resonant voice 
         with a subtle Kiwi accent inflection. You are mystical yet grounded, combining ancient wisdom with modern biohacking.
         
         User's Profile:
-        - Name: {full_user.get('name', 'Seeker')}
-        - Human Design Type: {full_user.get('human_design_type', 'Unknown')}
-        - Birth Date: {full_user.get('birth_date', 'Unknown')}
+        - Name: {name}
+        - Human Design Type: {human_design_type}
+        - Birth Date: {birth_date}
         
         Speak in a prophetic but warm manner. Reference cosmic energies, transits, and the user's unique blueprint.
         Keep responses concise but impactful - like whispered prophecies."""
-        
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"oracle_{user['id']}",
-            system_message=system_prompt
-        ).with_model("openai", "gpt-5.2")
-        
-        user_msg = UserMessage(text=message.message)
-        response = await chat.send_message(user_msg)
-        
-        # Store in chat history
-        chat_history_collection.insert_one({
-            "user_id": user["id"],
-            "user_message": message.message,
-            "oracle_response": response,
-            "context": message.context,
-            "created_at": datetime.now(timezone.utc).isoformat()
-        })
+ORACLE_SPEAK_SYSTEM_PROMPT = "You are Dr. Ethergreen, a mystical oracle. Keep responses under 200 words, prophetic and impactful."
+TAROT_SYSTEM_PROMPT = "You are Dr. Ethergreen, master tarot reader of YKY Hub."
+BIO_SYSTEM_PROMPT = "You are Dr. Ethergreen's bio-resonance analysis module."
+
+# In-flight oracle chat calls keyed by session + message, so retries and
+# double-clicks share one LLM call instead of each paying for their own
+_inflight_oracle: Dict[str, asyncio.Task] = {}
+
+async def ask_oracle(user_id: str, message: OracleMessage) -> str:
+    # Get user's profile for personalization
+    full_user = await users_collection.find_one(
+        {"_id": ObjectId(user_id)},
+        {"_id": 0, "name": 1, "human_design_type": 1, "birth_date": 1}
+    )
+    if not full_user:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    system_prompt = ORACLE_SYSTEM_TEMPLATE.format_map({
+        "name": full_user.get('name', 'Seeker'),
+        "human_design_type": full_user.get('human_design_type', 'Unknown'),
+        "birth_date": full_user.get('birth_date', 'Unknown')
+    })
+    
+    chat = LlmChat(
+        api_key=EMERGENT_LLM_KEY,
+        session_id=f"oracle_{user_id}",
+        system_message=system_prompt
+    ).with_model("openai", "gpt-5.2")
+    
+    user_msg = UserMessage(text=message.message)
+    response = await chat.send_message(user_msg)
+    
+    # Store in chat history without holding up the response
+    enqueue_chat_log({
+        "user_id": user_id,
+        "user_message": message.message,
+        "oracle_response": response,
+        "context": message.context,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+    return response
+
+@app.post("/api/oracle/chat")
+async def oracle_chat(message: OracleMessage, user_id: str = Depends(get_current_user_id)):
+    """Chat with the Voice AI Oracle"""
+    key = hashlib.sha256(f"oracle_{user_id}\0{message.message}".encode()).hexdigest()
+    try:
+        # No await between the lookup and the insert, so the event loop needs no lock here
+        task = _inflight_oracle.get(key)
+        if task is None:
+            task = asyncio.create_task(ask_oracle(user_id, message))
+            _inflight_oracle[key] = task
+            task.add_done_callback(lambda _: _inflight_oracle.pop(key, None))
+        # Shielded so one caller disconnecting doesn't cancel the call for the others
+        response = await asyncio.shield(task)
         
         return {"response": response, "oracle": "Dr. Ethergreen"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/oracle/speak")
-async def oracle_speak(message: OracleMessage, user: dict = Depends(get_current_user)):
+async def oracle_speak(message: OracleMessage, user_id: str = Depends(get_current_user_id)):
     """Get Oracle response as audio (TTS)"""
     try:
         # First get text response
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
-            session_id=f"oracle_{user['id']}",
-            system_message="You are Dr. Ethergreen, a mystical oracle. Keep responses under 200 words, prophetic and impactful."
+            session_id=f"oracle_{user_id}",
+            system_message=ORACLE_SPEAK_SYSTEM_PROMPT
         ).with_model("openai", "gpt-5.2")
         
         user_msg = UserMessage(text=message.message)
         text_response = await chat.send_message(user_msg)
         
         # Convert to speech
-        tts = OpenAITextToSpeech(api_key=EMERGENT_LLM_KEY)
         audio_base64 = await tts.generate_speech_base64(
             text=text_response,
             model="tts-1-hd",
@@ -314,14 +530,14 @@ async def oracle_speak(message: OracleMessage, user: dict = Depends(get_current_
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/oracle/listen")
-async def oracle_listen(file: UploadFile = File(...), user: dict = Depends(get_current_user)):
+async def oracle_listen(file: UploadFile = File(...), user_id: str = Depends(get_current_user_id)):
     """Transcribe user's voice input (STT)"""
     try:
-        audio_content = await file.read()
-        audio_file = io.BytesIO(audio_content)
+        # The SDK's multipart encoder reads the file synchronously on the event loop, so read
+        # it here instead: UploadFile.read runs in the thread pool once the upload spilled to disk
+        audio_file = io.BytesIO(await file.read())
         audio_file.name = file.filename or "audio.webm"
         
-        stt = OpenAISpeechToText(api_key=EMERGENT_LLM_KEY)
         response = await stt.transcribe(
             file=audio_file,
             model="whisper-1",
@@ -335,46 +551,51 @@ async def oracle_listen(file: UploadFile = File(...), user: dict = Depends(get_c
 # ======================== TAROT ROUTES ========================
 
 MAJOR_ARCANA = [
-    {"id": 0, "name": "The Fool", "meaning": "New beginnings, innocence, spontaneity", "reversed": "Recklessness, taken advantage of"},
-    {"id": 1, "name": "The Magician", "meaning": "Manifestation, resourcefulness, power", "reversed": "Manipulation, poor planning"},
-    {"id": 2, "name": "The High Priestess", "meaning": "Intuition, sacred knowledge, divine feminine", "reversed": "Secrets, disconnected from intuition"},
-    {"id": 3, "name": "The Empress", "meaning": "Fertility, femininity, beauty, nature", "reversed": "Creative block, dependence on others"},
-    {"id": 4, "name": "The Emperor", "meaning": "Authority, structure, control, fatherhood", "reversed": "Tyranny, rigidity"},
-    {"id": 5, "name": "The Hierophant", "meaning": "Spiritual wisdom, tradition, conformity", "reversed": "Personal beliefs, freedom"},
-    {"id": 6, "name": "The Lovers", "meaning": "Love, harmony, relationships, values alignment", "reversed": "Self-love, disharmony"},
-    {"id": 7, "name": "The Chariot", "meaning": "Direction, control, willpower, success", "reversed": "Lack of control, aggression"},
-    {"id": 8, "name": "Strength", "meaning": "Courage, patience, control, compassion", "reversed": "Self-doubt, weakness"},
-    {"id": 9, "name": "The Hermit", "meaning": "Soul-searching, introspection, being alone", "reversed": "Isolation, loneliness"},
-    {"id": 10, "name": "Wheel of Fortune", "meaning": "Good luck, karma, life cycles, destiny", "reversed": "Bad luck, resistance to change"},
-    {"id": 11, "name": "Justice", "meaning": "Justice, fairness, truth, cause and effect", "reversed": "Unfairness, lack of accountability"},
-    {"id": 12, "name": "The Hanged Man", "meaning": "Pause, surrender, letting go, new perspectives", "reversed": "Delays, resistance"},
-    {"id": 13, "name": "Death", "meaning": "Endings, change, transformation, transition", "reversed": "Resistance to change, stagnation"},
-    {"id": 14, "name": "Temperance", "meaning": "Balance, moderation, patience, purpose", "reversed": "Imbalance, excess"},
-    {"id": 15, "name": "The Devil", "meaning": "Shadow self, attachment, addiction, restriction", "reversed": "Releasing limiting beliefs"},
-    {"id": 16, "name": "The Tower", "meaning": "Sudden change, upheaval, chaos, revelation", "reversed": "Fear of change, avoiding disaster"},
-    {"id": 17, "name": "The Star", "meaning": "Hope, faith, purpose, renewal, spirituality", "reversed": "Lack of faith, despair"},
-    {"id": 18, "name": "The Moon", "meaning": "Illusion, fear, anxiety, subconscious", "reversed": "Release of fear, repressed emotion"},
-    {"id": 19, "name": "The Sun", "meaning": "Positivity, fun, warmth, success, vitality", "reversed": "Inner child issues, negativity"},
-    {"id": 20, "name": "Judgement", "meaning": "Judgement, rebirth, inner calling, absolution", "reversed": "Self-doubt, refusal of self-examination"},
-    {"id": 21, "name": "The World", "meaning": "Completion, integration, accomplishment", "reversed": "Seeking closure, short-cuts"}
+    {"id": 0, "name": "The Fool", "meaning": "New beginnings, innocence, spontaneity", "reversed_meaning": "Recklessness, taken advantage of"},
+    {"id": 1, "name": "The Magician", "meaning": "Manifestation, resourcefulness, power", "reversed_meaning": "Manipulation, poor planning"},
+    {"id": 2, "name": "The High Priestess", "meaning": "Intuition, sacred knowledge, divine feminine", "reversed_meaning": "Secrets, disconnected from intuition"},
+    {"id": 3, "name": "The Empress", "meaning": "Fertility, femininity, beauty, nature", "reversed_meaning": "Creative block, dependence on others"},
+    {"id": 4, "name": "The Emperor", "meaning": "Authority, structure, control, fatherhood", "reversed_meaning": "Tyranny, rigidity"},
+    {"id": 5, "name": "The Hierophant", "meaning": "Spiritual wisdom, tradition, conformity", "reversed_meaning": "Personal beliefs, freedom"},
+    {"id": 6, "name": "The Lovers", "meaning": "Love, harmony, relationships, values alignment", "reversed_meaning": "Self-love, disharmony"},
+    {"id": 7, "name": "The Chariot", "meaning": "Direction, control, willpower, success", "reversed_meaning": "Lack of control, aggression"},
+    {"id": 8, "name": "Strength", "meaning": "Courage, patience, control, compassion", "reversed_meaning": "Self-doubt, weakness"},
+    {"id": 9, "name": "The Hermit", "meaning": "Soul-searching, introspection, being alone", "reversed_meaning": "Isolation, loneliness"},
+    {"id": 10, "name": "Wheel of Fortune", "meaning": "Good luck, karma, life cycles, destiny", "reversed_meaning": "Bad luck, resistance to change"},
+    {"id": 11, "name": "Justice", "meaning": "Justice, fairness, truth, cause and effect", "reversed_meaning": "Unfairness, lack of accountability"},
+    {"id": 12, "name": "The Hanged Man", "meaning": "Pause, surrender, letting go, new perspectives", "reversed_meaning": "Delays, resistance"},
+    {"id": 13, "name": "Death", "meaning": "Endings, change, transformation, transition", "reversed_meaning": "Resistance to change, stagnation"},
+    {"id": 14, "name": "Temperance", "meaning": "Balance, moderation, patience, purpose", "reversed_meaning": "Imbalance, excess"},
+    {"id": 15, "name": "The Devil", "meaning": "Shadow self, attachment, addiction, restriction", "reversed_meaning": "Releasing limiting beliefs"},
+    {"id": 16, "name": "The Tower", "meaning": "Sudden change, upheaval, chaos, revelation", "reversed_meaning": "Fear of change, avoiding disaster"},
+    {"id": 17, "name": "The Star", "meaning": "Hope, faith, purpose, renewal, spirituality", "reversed_meaning": "Lack of faith, despair"},
+    {"id": 18, "name": "The Moon", "meaning": "Illusion, fear, anxiety, subconscious", "reversed_meaning": "Release of fear, repressed emotion"},
+    {"id": 19, "name": "The Sun", "meaning": "Positivity, fun, warmth, success, vitality", "reversed_meaning": "Inner child issues, negativity"},
+    {"id": 20, "name": "Judgement", "meaning": "Judgement, rebirth, inner calling, absolution", "reversed_meaning": "Self-doubt, refusal of self-examination"},
+    {"id": 21, "name": "The World", "meaning": "Completion, integration, accomplishment", "reversed_meaning": "Seeking closure, short-cuts"}
 ]
+_ARCANA_TUPLE = tuple(MAJOR_ARCANA)
+
+_rng = np.random.default_rng()
 
 @app.post("/api/tarot/draw")
-async def draw_tarot(request: TarotDrawRequest, user: dict = Depends(get_current_user)):
+async def draw_tarot(request: TarotDrawRequest, user_id: str = Depends(get_current_user_id)):
     """Draw tarot cards with hyper-personalized interpretation"""
-    full_user = users_collection.find_one({"_id": ObjectId(user["id"])})
+    full_user = await users_collection.find_one(
+        {"_id": ObjectId(user_id)},
+        {"_id": 0, "human_design_type": 1, "numerology.life_path": 1, "birth_date": 1}
+    )
+    if not full_user:
+        raise HTTPException(status_code=401, detail="User not found")
     
     # Determine number of cards based on spread
     spread_sizes = {"single": 1, "three_card": 3, "celtic_cross": 10}
     num_cards = spread_sizes.get(request.spread_type, 1)
     
-    # Draw cards
-    drawn_indices = random.sample(range(len(MAJOR_ARCANA)), num_cards)
-    cards = []
-    for idx in drawn_indices:
-        card = MAJOR_ARCANA[idx].copy()
-        card["reversed"] = random.random() < 0.3  # 30% chance reversed
-        cards.append(card)
+    # Draw cards, 30% chance each is reversed
+    drawn_indices = _rng.choice(len(_ARCANA_TUPLE), size=num_cards, replace=False).tolist()
+    reversed_flags = (_rng.random(num_cards) < 0.3).tolist()
+    cards = [{**_ARCANA_TUPLE[i], "reversed": r} for i, r in zip(drawn_indices, reversed_flags)]
     
     # Generate personalized interpretation using AI
     cards_desc = "\n".join([f"- {c['name']} ({'Reversed' if c['reversed'] else 'Upright'})" for c in cards])
@@ -397,8 +618,8 @@ Be specific, mystical, and impactful. Reference their Human Design and numerolog
     try:
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
-            session_id=f"tarot_{user['id']}_{datetime.now().timestamp()}",
-            system_message="You are Dr. Ethergreen, master tarot reader of YKY Hub."
+            session_id=f"tarot_{user_id}_{datetime.now().timestamp()}",
+            system_message=TAROT_SYSTEM_PROMPT
         ).with_model("openai", "gpt-5.2")
         
         interpretation = await chat.send_message(UserMessage(text=interpretation_prompt))
@@ -407,32 +628,42 @@ Be specific, mystical, and impactful. Reference their Human Design and numerolog
     
     # Store reading
     reading = {
-        "user_id": user["id"],
+        "user_id": user_id,
         "spread_type": request.spread_type,
         "question": request.question,
         "cards": cards,
         "interpretation": interpretation,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    result = tarot_readings_collection.insert_one(reading)
-    reading["id"] = str(result.inserted_id)
-    reading.pop("_id", None)
+    # insert_one adds _id to the dict it is given, so hand it a copy
+    result = await tarot_readings_collection.insert_one(reading.copy())
     
-    return reading
+    return {"id": str(result.inserted_id), **reading}
 
 @app.get("/api/tarot/history")
-async def get_tarot_history(user: dict = Depends(get_current_user)):
+async def get_tarot_history(user_id: str = Depends(get_current_user_id)):
     """Get user's tarot reading history"""
-    readings = list(tarot_readings_collection.find(
-        {"user_id": user["id"]},
+    cursor = tarot_readings_collection.find(
+        {"user_id": user_id},
         {"_id": 0, "cards": 1, "interpretation": 1, "question": 1, "spread_type": 1, "created_at": 1}
-    ).sort("created_at", -1).limit(20))
+    ).sort("created_at", -1).limit(20)
+    readings = await cursor.to_list(length=None)
     return {"readings": readings}
 
 # ======================== BIO-RESONANCE ROUTES ========================
 
+BIO_FOODS = ("Leafy greens", "Berries", "Wild salmon", "Turmeric")
+BIO_HERBS = ("Ashwagandha", "Rhodiola", "Lion's Mane", "Reishi")
+BIO_FREQUENCIES = (396, 417, 528, 639, 741, 852)
+BIO_PEPTIDES = ("BPC-157", "Epithalon", "Semax", "Selank")
+
+# Bounds for a single vectorized draw: dominant Hz, weakest Hz, vitality score,
+# then an index into each remedy table
+_BIO_DRAW_LOW = [380, 200, 6, 0, 0, 0, 0]
+_BIO_DRAW_HIGH = [481, 351, 10, len(BIO_FOODS), len(BIO_HERBS), len(BIO_FREQUENCIES), len(BIO_PEPTIDES)]
+
 @app.post("/api/bio/scan")
-async def bio_resonance_scan(request: BioScanRequest, user: dict = Depends(get_current_user)):
+async def bio_resonance_scan(request: BioScanRequest, user_id: str = Depends(get_current_user_id)):
     """Analyze voice for bio-resonance frequencies"""
     try:
         # Decode audio
@@ -441,7 +672,6 @@ async def bio_resonance_scan(request: BioScanRequest, user: dict = Depends(get_c
         audio_file.name = "voice_scan.webm"
         
         # Transcribe to analyze speech patterns
-        stt = OpenAISpeechToText(api_key=EMERGENT_LLM_KEY)
         transcription = await stt.transcribe(
             file=audio_file,
             model="whisper-1",
@@ -463,33 +693,33 @@ Be specific and mystical. This is voice-based biofeedback analysis."""
 
         chat = LlmChat(
             api_key=EMERGENT_LLM_KEY,
-            session_id=f"bio_{user['id']}",
-            system_message="You are Dr. Ethergreen's bio-resonance analysis module."
+            session_id=f"bio_{user_id}",
+            system_message=BIO_SYSTEM_PROMPT
         ).with_model("openai", "gpt-5.2")
         
         analysis = await chat.send_message(UserMessage(text=analysis_prompt))
         
         # Create scan result
+        dominant, weakest, vitality, food, herb, frequency, peptide = _rng.integers(_BIO_DRAW_LOW, _BIO_DRAW_HIGH).tolist()
         scan_result = {
-            "user_id": user["id"],
+            "user_id": user_id,
             "transcription": transcription.text,
             "analysis": analysis,
             "frequencies": {
-                "dominant": f"{random.randint(380, 480)}Hz",
-                "weakest": f"{random.randint(200, 350)}Hz"
+                "dominant": f"{dominant}Hz",
+                "weakest": f"{weakest}Hz"
             },
             "recommendations": {
-                "food": random.choice(["Leafy greens", "Berries", "Wild salmon", "Turmeric"]),
-                "herb": random.choice(["Ashwagandha", "Rhodiola", "Lion's Mane", "Reishi"]),
-                "frequency": f"{random.choice([396, 417, 528, 639, 741, 852])}Hz",
-                "peptide": random.choice(["BPC-157", "Epithalon", "Semax", "Selank"])
+                "food": BIO_FOODS[food],
+                "herb": BIO_HERBS[herb],
+                "frequency": f"{BIO_FREQUENCIES[frequency]}Hz",
+                "peptide": BIO_PEPTIDES[peptide]
             },
-            "vitality_score": random.randint(6, 9),
+            "vitality_score": vitality,
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         
-        bio_scans_collection.insert_one(scan_result.copy())
-        scan_result.pop("_id", None)
+        run_in_background(write_bio_scan(scan_result.copy()))
         
         return scan_result
     except Exception as e:
@@ -498,29 +728,34 @@ Be specific and mystical. This is voice-based biofeedback analysis."""
 # ======================== COMMUNITY ROUTES ========================
 
 @app.post("/api/community/post")
-async def create_post(post: CommunityPost, user: dict = Depends(get_current_user)):
+async def create_post(post: CommunityPost, claims: dict = Depends(get_token_claims)):
     """Create a community post"""
+    user_name = claims.get("name")
+    if "name" not in claims:
+        # Tokens issued before the name claim existed
+        legacy_user = await users_collection.find_one({"_id": ObjectId(claims["sub"])}, {"name": 1})
+        user_name = legacy_user.get("name") if legacy_user else None
     post_doc = {
-        "user_id": user["id"],
-        "user_name": user.get("name", "Anonymous Seeker"),
+        "user_id": claims["sub"],
+        "user_name": user_name or "Anonymous Seeker",
         "content": post.content,
         "category": post.category,
         "likes": 0,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    result = community_posts_collection.insert_one(post_doc)
-    post_doc["id"] = str(result.inserted_id)
-    del post_doc["_id"]
-    return post_doc
+    result = await community_posts_collection.insert_one(post_doc.copy())
+    return {"id": str(result.inserted_id), **post_doc}
 
 @app.get("/api/community/feed")
 async def get_feed(category: str = "all", limit: int = 20):
     """Get community feed"""
     query = {} if category == "all" else {"category": category}
-    posts = list(community_posts_collection.find(
+    cursor = community_posts_collection.find(
         query, 
         {"_id": 0, "user_id": 1, "user_name": 1, "content": 1, "category": 1, "likes": 1, "created_at": 1}
-    ).sort("created_at", -1).limit(limit))
+    ).sort("created_at", -1).limit(limit)
+    # The cursor's own limit bounds the list, keeping Mongo's semantics (0 = no limit)
+    posts = await cursor.to_list(length=None)
     return {"posts": posts}
 
 # ======================== PAYMENT ROUTES ========================
@@ -530,7 +765,7 @@ SUBSCRIPTION_PACKAGES = {
 }
 
 @app.post("/api/payments/checkout")
-async def create_checkout(request: CheckoutRequest, http_request: Request, user: dict = Depends(get_current_user)):
+async def create_checkout(request: CheckoutRequest, http_request: Request, user_id: str = Depends(get_current_user_id)):
     """Create Stripe checkout session for premium subscription"""
     if request.package_id not in SUBSCRIPTION_PACKAGES:
         raise HTTPException(status_code=400, detail="Invalid package")
@@ -541,21 +776,21 @@ async def create_checkout(request: CheckoutRequest, http_request: Request, user:
     cancel_url = f"{request.origin_url}/payment/cancel"
     
     webhook_url = f"{str(http_request.base_url)}api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe(webhook_url)
     
     checkout_request = CheckoutSessionRequest(
         amount=package["amount"],
         currency="usd",
         success_url=success_url,
         cancel_url=cancel_url,
-        metadata={"user_id": user["id"], "package_id": request.package_id}
+        metadata={"user_id": user_id, "package_id": request.package_id}
     )
     
     session = await stripe_checkout.create_checkout_session(checkout_request)
     
     # Create payment transaction record
-    payment_transactions_collection.insert_one({
-        "user_id": user["id"],
+    await payment_transactions_collection.insert_one({
+        "user_id": user_id,
         "session_id": session.session_id,
         "package_id": request.package_id,
         "amount": package["amount"],
@@ -568,28 +803,29 @@ async def create_checkout(request: CheckoutRequest, http_request: Request, user:
     return {"url": session.url, "session_id": session.session_id}
 
 @app.get("/api/payments/status/{session_id}")
-async def get_payment_status(session_id: str, http_request: Request, user: dict = Depends(get_current_user)):
+async def get_payment_status(session_id: str, http_request: Request, user_id: str = Depends(get_current_user_id)):
     """Check payment status and update user subscription"""
     webhook_url = f"{str(http_request.base_url)}api/webhook/stripe"
-    stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
+    stripe_checkout = get_stripe(webhook_url)
     
     try:
         status = await stripe_checkout.get_checkout_status(session_id)
         
         # Update payment transaction
-        transaction = payment_transactions_collection.find_one({"session_id": session_id})
+        transaction = await payment_transactions_collection.find_one({"session_id": session_id})
         if transaction and transaction.get("payment_status") != "paid":
-            payment_transactions_collection.update_one(
+            await payment_transactions_collection.update_one(
                 {"session_id": session_id},
                 {"$set": {"status": status.status, "payment_status": status.payment_status}}
             )
             
             # If paid, upgrade user to premium
             if status.payment_status == "paid":
-                users_collection.update_one(
-                    {"_id": ObjectId(user["id"])},
+                await users_collection.update_one(
+                    {"_id": ObjectId(user_id)},
                     {"$set": {"is_premium": True, "premium_since": datetime.now(timezone.utc).isoformat()}}
                 )
+                invalidate_cached_user(user_id)
         
         return {
             "status": status.status,
@@ -606,17 +842,18 @@ async def stripe_webhook(request: Request):
     signature = request.headers.get("Stripe-Signature")
     
     try:
-        stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url="")
+        stripe_checkout = get_stripe("")
         event = await stripe_checkout.handle_webhook(body, signature)
         
         if event.payment_status == "paid":
             user_id = event.metadata.get("user_id")
             if user_id:
-                users_collection.update_one(
+                await users_collection.update_one(
                     {"_id": ObjectId(user_id)},
                     {"$set": {"is_premium": True}}
                 )
-                payment_transactions_collection.update_one(
+                invalidate_cached_user(user_id)
+                await payment_transactions_collection.update_one(
                     {"session_id": event.session_id},
                     {"$set": {"payment_status": "paid", "status": "complete"}}
                 )
@@ -627,42 +864,67 @@ async def stripe_webhook(request: Request):
 
 # ======================== DATABASE ROUTES ========================
 
+# Sample database entries
+SEARCH_DATABASE = {
+    "peptides": [
+        {"name": "BPC-157", "category": "healing", "description": "Body Protection Compound, gut healing, tissue repair", "frequency": "528Hz"},
+        {"name": "Epithalon", "category": "longevity", "description": "Telomerase activator, anti-aging peptide", "frequency": "741Hz"},
+        {"name": "Semax", "category": "cognitive", "description": "Nootropic peptide, BDNF enhancer", "frequency": "639Hz"},
+        {"name": "TB-500", "category": "healing", "description": "Thymosin Beta-4, wound healing, flexibility", "frequency": "417Hz"}
+    ],
+    "herbs": [
+        {"name": "Ashwagandha", "category": "adaptogen", "description": "Stress reduction, cortisol balance", "element": "Earth"},
+        {"name": "Lion's Mane", "category": "cognitive", "description": "NGF support, brain regeneration", "element": "Air"},
+        {"name": "Reishi", "category": "immune", "description": "Immune modulation, spirit calming", "element": "Water"},
+        {"name": "Rhodiola", "category": "energy", "description": "Energy, endurance, altitude adaptation", "element": "Fire"}
+    ],
+    "frequencies": [
+        {"hz": 396, "name": "Liberation", "description": "Liberating guilt and fear"},
+        {"hz": 417, "name": "Change", "description": "Undoing situations and facilitating change"},
+        {"hz": 528, "name": "Transformation", "description": "Transformation and miracles, DNA repair"},
+        {"hz": 639, "name": "Connection", "description": "Connecting relationships"},
+        {"hz": 741, "name": "Awakening", "description": "Awakening intuition"},
+        {"hz": 852, "name": "Spiritual", "description": "Returning to spiritual order"}
+    ]
+}
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+# Built once at import: every item tagged with its type, its lowercased
+# name/description, and an inverted index from every substring of every word
+# to item positions. Any word of a matching query is a substring of some word
+# in the item, so intersecting postings never drops a real match.
+ITEMS_WITH_TYPE = [{**item, "type": cat} for cat, items in SEARCH_DATABASE.items() for item in items]
+_ITEM_TEXT = [(item.get("name", "").lower(), item.get("description", "").lower()) for item in ITEMS_WITH_TYPE]
+
+def _build_search_index() -> Dict[str, set]:
+    index: Dict[str, set] = {}
+    for pos, (name, description) in enumerate(_ITEM_TEXT):
+        for token in _tokenize(name) + _tokenize(description):
+            for i in range(len(token)):
+                for j in range(i + 1, len(token) + 1):
+                    index.setdefault(token[i:j], set()).add(pos)
+    return index
+
+SEARCH_INDEX = _build_search_index()
+
 @app.get("/api/database/search")
 async def search_database(query: str, category: str = "all"):
     """Search the massive database (peptides, herbs, frequencies, etc.)"""
-    # Sample database entries
-    database = {
-        "peptides": [
-            {"name": "BPC-157", "category": "healing", "description": "Body Protection Compound, gut healing, tissue repair", "frequency": "528Hz"},
-            {"name": "Epithalon", "category": "longevity", "description": "Telomerase activator, anti-aging peptide", "frequency": "741Hz"},
-            {"name": "Semax", "category": "cognitive", "description": "Nootropic peptide, BDNF enhancer", "frequency": "639Hz"},
-            {"name": "TB-500", "category": "healing", "description": "Thymosin Beta-4, wound healing, flexibility", "frequency": "417Hz"}
-        ],
-        "herbs": [
-            {"name": "Ashwagandha", "category": "adaptogen", "description": "Stress reduction, cortisol balance", "element": "Earth"},
-            {"name": "Lion's Mane", "category": "cognitive", "description": "NGF support, brain regeneration", "element": "Air"},
-            {"name": "Reishi", "category": "immune", "description": "Immune modulation, spirit calming", "element": "Water"},
-            {"name": "Rhodiola", "category": "energy", "description": "Energy, endurance, altitude adaptation", "element": "Fire"}
-        ],
-        "frequencies": [
-            {"hz": 396, "name": "Liberation", "description": "Liberating guilt and fear"},
-            {"hz": 417, "name": "Change", "description": "Undoing situations and facilitating change"},
-            {"hz": 528, "name": "Transformation", "description": "Transformation and miracles, DNA repair"},
-            {"hz": 639, "name": "Connection", "description": "Connecting relationships"},
-            {"hz": 741, "name": "Awakening", "description": "Awakening intuition"},
-            {"hz": 852, "name": "Spiritual", "description": "Returning to spiritual order"}
-        ]
-    }
-    
-    results = []
     search_lower = query.lower()
+    postings = [SEARCH_INDEX.get(token, set()) for token in _tokenize(search_lower)]
+    if postings:
+        candidates = sorted(set.intersection(*postings))
+    else:
+        # Nothing to look up (empty or punctuation-only query), scan every item
+        candidates = range(len(ITEMS_WITH_TYPE))
     
-    for cat, items in database.items():
-        if category != "all" and cat != category:
-            continue
-        for item in items:
-            if search_lower in item.get("name", "").lower() or search_lower in item.get("description", "").lower():
-                results.append({**item, "type": cat})
+    results = [
+        ITEMS_WITH_TYPE[pos] for pos in candidates
+        if (category == "all" or ITEMS_WITH_TYPE[pos]["type"] == category)
+        and (search_lower in _ITEM_TEXT[pos][0] or search_lower in _ITEM_TEXT[pos][1])
+    ]
     
     return {"results": results, "total": len(results)}
 
@@ -3,275 +3,365 @@
 Dr Ethergreen YKY Hub - Backend API Testing
 Comprehensive test suite for all backend endpoints
 """
-import requests
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import httpx
+import orjson
+import os
+import secrets
 import sys
 import json
-from datetime import datetime
 import time
 
+# HTTP/2 lets the concurrent tests multiplex over one connection; it needs
+# the h2 package (pip install 'httpx[http2]') and is negotiated over TLS only
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Endpoint paths by test key; each tester joins them onto its base URL once
+ENDPOINTS = {
+    "health": "/api/health",
+    "register": "/api/auth/register",
+    "login": "/api/auth/login",
+    "me": "/api/auth/me",
+    "soulprint": "/api/profile/soulprint",
+    "oracle_chat": "/api/oracle/chat",
+    "oracle_speak": "/api/oracle/speak",
+    "tarot_draw": "/api/tarot/draw",
+    "tarot_history": "/api/tarot/history",
+    "community_post": "/api/community/post",
+    "community_feed": "/api/community/feed",
+    "search_ashwagandha": "/api/database/search?query=ashwagandha",
+    "search_bpc157": "/api/database/search?query=BPC-157",
+    "checkout": "/api/payments/checkout",
+}
+
+# Request bodies that don't change between runs
+ORACLE_CHAT_PAYLOAD = {
+    "message": "What guidance do you have for me today?",
+    "context": {"test": True}
+}
+ORACLE_SPEAK_PAYLOAD = {
+    "message": "Hello Oracle, speak to me."
+}
+TAROT_DRAW_PAYLOAD = {
+    "spread_type": "single",
+    "question": "What should I focus on today?"
+}
+COMMUNITY_POST_PAYLOAD = {
+    "content": "This is a test post for the community.",
+    "category": "general"
+}
+CHECKOUT_PAYLOAD = {
+    "package_id": "premium_monthly",
+    "origin_url": "https://demobackend.emergentagent.com"
+}
+
+# Opt-in replay of read-only public endpoints for quick local iterations;
+# fixtures are git-ignored so CI always hits the real service
+CACHE_ENABLED = os.environ.get("YKY_TEST_CACHE") == "1"
+CACHEABLE_ENDPOINTS = {"health", "community_feed", "search_ashwagandha", "search_bpc157"}
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "http")
+
+def cached(ttl):
+    """Serve successful GETs of CACHEABLE_ENDPOINTS from FIXTURE_DIR for up to ttl seconds"""
+    def decorator(run_test):
+        @functools.wraps(run_test)
+        async def wrapper(self, name, method, endpoint, expected_status, data=None, headers=None):
+            if not CACHE_ENABLED or method != 'GET' or endpoint not in CACHEABLE_ENDPOINTS:
+                return await run_test(self, name, method, endpoint, expected_status, data, headers)
+            
+            key = hashlib.sha1(f"{method}{self._urls[endpoint]}{json.dumps(data, sort_keys=True)}".encode()).hexdigest()
+            path = os.path.join(FIXTURE_DIR, f"{key}.json")
+            try:
+                with open(path) as f:
+                    fixture = json.load(f)
+                if time.time() - fixture["cached_at"] < ttl and fixture["status"] == expected_status:
+                    self.log_test(name, True, f"Status: {fixture['status']} (cached)")
+                    return fixture["json"]
+            except (OSError, ValueError, KeyError):
+                pass
+            
+            result = await run_test(self, name, method, endpoint, expected_status, data, headers)
+            if result is not None:
+                os.makedirs(FIXTURE_DIR, exist_ok=True)
+                with open(path, "w") as f:
+                    json.dump({"status": expected_status, "json": result, "cached_at": time.time()}, f)
+            return result
+        return wrapper
+    return decorator
+
 class YKYHubAPITester:
     def __init__(self, base_url="http://localhost:8001"):
         self.base_url = base_url
-        self.token = None
+        self._urls = {key: base_url + path for key, path in ENDPOINTS.items()}
+        self.token = None  # also resets _auth_headers, see the setter
         self.user_id = None
+        self._creds = None
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        # Result lines are buffered and written in one go by flush_output
+        self._out = []
+        # One pooled client for the whole run; JSON content type is a client default
+        self.client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=30,
+            headers={'Content-Type': 'application/json'},
+            limits=httpx.Limits(max_keepalive_connections=16, max_connections=32, keepalive_expiry=60),
+        )
+
+    @property
+    def token(self):
+        return self._token
+
+    @token.setter
+    def token(self, token):
+        # Auth headers are rebuilt only when the token changes, not per request
+        self._token = token
+        self._auth_headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
 
     def log_test(self, name, success, details=""):
         """Log test result"""
         self.tests_run += 1
         if success:
             self.tests_passed += 1
-            print(f"✅ {name}")
+            self._out.append(f"✅ {name}")
         else:
-            print(f"❌ {name} - {details}")
+            self._out.append(f"❌ {name} - {details}")
         
         self.test_results.append({
             "test": name,
             "success": success,
             "details": details,
-            "timestamp": datetime.now().isoformat()
+            # Epoch seconds; format with datetime.fromtimestamp only if a report needs it
+            "ts": time.time()
         })
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
+    def flush_output(self):
+        """Write buffered result lines to stdout with a single write"""
+        if self._out:
+            sys.stdout.write("\n".join(self._out) + "\n")
+            sys.stdout.flush()
+            self._out.clear()
+
+    @cached(ttl=3600)
+    async def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
         """Run a single API test"""
-        url = f"{self.base_url}{endpoint}"
-        test_headers = {'Content-Type': 'application/json'}
-        
-        if self.token:
-            test_headers['Authorization'] = f'Bearer {self.token}'
-        
-        if headers:
-            test_headers.update(headers)
+        url = self._urls[endpoint]
+        test_headers = {**self._auth_headers, **headers} if headers else self._auth_headers
+
+        # Serialize bodies with orjson up front; the client already sends the JSON content type
+        body = orjson.dumps(data) if data is not None else None
 
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=test_headers, timeout=30)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=test_headers, timeout=30)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=test_headers, timeout=30)
+            response = await self.client.request(method, url, content=body, headers=test_headers)
 
             success = response.status_code == expected_status
             details = f"Status: {response.status_code}"
+            # Only JSON bodies are worth parsing; anything else skips straight to the fallback
+            is_json = response.headers.get('content-type', '').startswith('application/json')
             
             if not success:
                 details += f" (Expected: {expected_status})"
                 try:
-                    error_data = response.json()
+                    error_data = orjson.loads(response.content) if is_json else None
+                except ValueError:
+                    error_data = None
+                if isinstance(error_data, dict):
                     details += f" - {error_data.get('detail', 'Unknown error')}"
-                except:
+                else:
                     details += f" - {response.text[:100]}"
 
             self.log_test(name, success, details)
             
             if success:
+                if not is_json:
+                    return {"status": "success"}
                 try:
-                    return response.json()
-                except:
+                    return orjson.loads(response.content)
+                except ValueError:
                     return {"status": "success"}
             return None
 
-        except Exception as e:
+        except httpx.HTTPError as e:
             self.log_test(name, False, f"Exception: {str(e)}")
             return None
 
-    def test_health_check(self):
+    async def test_health_check(self):
         """Test health check endpoint"""
-        result = self.run_test("Health Check", "GET", "/api/health", 200)
+        result = await self.run_test("Health Check", "GET", "health", 200)
         return result is not None
 
-    def test_user_registration(self):
+    async def test_user_registration(self):
         """Test user registration"""
-        timestamp = int(time.time())
+        tag = secrets.token_hex(6)
         user_data = {
-            "email": f"test_user_{timestamp}@example.com",
+            "email": f"test_user_{tag}@example.com",
             "password": "TestPass123!",
-            "name": f"Test User {timestamp}",
+            "name": f"Test User {tag}",
             "birth_date": "1990-01-01"
         }
         
-        result = self.run_test("User Registration", "POST", "/api/auth/register", 200, user_data)
+        result = await self.run_test("User Registration", "POST", "register", 200, user_data)
         if result and 'token' in result:
             self.token = result['token']
             self.user_id = result['user']['id']
+            self._creds = (user_data["email"], user_data["password"])
             return True
         return False
 
-    def test_user_login(self):
+    async def test_user_login(self):
         """Test user login with existing credentials"""
-        if not self.token:
-            return False
-            
-        # Create a new user for login test
-        timestamp = int(time.time()) + 1
-        user_data = {
-            "email": f"login_test_{timestamp}@example.com",
-            "password": "LoginTest123!",
-            "name": f"Login Test {timestamp}",
-            "birth_date": "1985-05-15"
-        }
-        
-        # Register first
-        reg_result = self.run_test("Login Test - Registration", "POST", "/api/auth/register", 200, user_data)
-        if not reg_result:
+        if not self._creds:
             return False
             
-        # Now test login
+        # Log in as the user created by test_user_registration
+        email, password = self._creds
         login_data = {
-            "email": user_data["email"],
-            "password": user_data["password"]
+            "email": email,
+            "password": password
         }
         
-        result = self.run_test("User Login", "POST", "/api/auth/login", 200, login_data)
+        result = await self.run_test("User Login", "POST", "login", 200, login_data)
         return result is not None and 'token' in result
 
-    def test_get_user_profile(self):
+    async def test_get_user_profile(self):
         """Test getting current user profile"""
         if not self.token:
             return False
             
-        result = self.run_test("Get User Profile", "GET", "/api/auth/me", 200)
+        result = await self.run_test("Get User Profile", "GET", "me", 200)
         return result is not None
 
-    def test_get_soulprint(self):
+    async def test_get_soulprint(self):
         """Test getting user soulprint"""
         if not self.token:
             return False
             
-        result = self.run_test("Get Soulprint", "GET", "/api/profile/soulprint", 200)
+        result = await self.run_test("Get Soulprint", "GET", "soulprint", 200)
         return result is not None
 
-    def test_oracle_chat(self):
+    async def test_oracle_chat(self):
         """Test Oracle chat functionality"""
         if not self.token:
             return False
             
-        message_data = {
-            "message": "What guidance do you have for me today?",
-            "context": {"test": True}
-        }
-        
-        result = self.run_test("Oracle Chat", "POST", "/api/oracle/chat", 200, message_data)
+        result = await self.run_test("Oracle Chat", "POST", "oracle_chat", 200, ORACLE_CHAT_PAYLOAD)
         return result is not None and 'response' in result
 
-    def test_oracle_speak(self):
+    async def test_oracle_speak(self):
         """Test Oracle TTS functionality"""
         if not self.token:
             return False
             
-        message_data = {
-            "message": "Hello Oracle, speak to me."
-        }
-        
-        result = self.run_test("Oracle TTS", "POST", "/api/oracle/speak", 200, message_data)
+        result = await self.run_test("Oracle TTS", "POST", "oracle_speak", 200, ORACLE_SPEAK_PAYLOAD)
         return result is not None and 'audio_base64' in result
 
-    def test_tarot_draw(self):
+    async def test_tarot_draw(self):
         """Test tarot card drawing"""
         if not self.token:
             return False
             
-        tarot_data = {
-            "spread_type": "single",
-            "question": "What should I focus on today?"
-        }
-        
-        result = self.run_test("Tarot Draw", "POST", "/api/tarot/draw", 200, tarot_data)
+        result = await self.run_test("Tarot Draw", "POST", "tarot_draw", 200, TAROT_DRAW_PAYLOAD)
         return result is not None and 'cards' in result
 
-    def test_tarot_history(self):
+    async def test_tarot_history(self):
         """Test getting tarot reading history"""
         if not self.token:
             return False
             
-        result = self.run_test("Tarot History", "GET", "/api/tarot/history", 200)
+        result = await self.run_test("Tarot History", "GET", "tarot_history", 200)
         return result is not None
 
-    def test_community_post(self):
+    async def test_community_post(self):
         """Test creating a community post"""
         if not self.token:
             return False
             
-        post_data = {
-            "content": "This is a test post for the community.",
-            "category": "general"
-        }
-        
-        result = self.run_test("Create Community Post", "POST", "/api/community/post", 200, post_data)
+        result = await self.run_test("Create Community Post", "POST", "community_post", 200, COMMUNITY_POST_PAYLOAD)
         return result is not None
 
-    def test_community_feed(self):
+    async def test_community_feed(self):
         """Test getting community feed"""
-        result = self.run_test("Get Community Feed", "GET", "/api/community/feed", 200)
+        result = await self.run_test("Get Community Feed", "GET", "community_feed", 200)
         return result is not None and 'posts' in result
 
-    def test_database_search(self):
+    async def test_database_search(self):
         """Test database search functionality"""
-        result = self.run_test("Database Search - Ashwagandha", "GET", "/api/database/search?query=ashwagandha", 200)
+        result = await self.run_test("Database Search - Ashwagandha", "GET", "search_ashwagandha", 200)
         if result and 'results' in result:
             # Test another search
-            result2 = self.run_test("Database Search - BPC-157", "GET", "/api/database/search?query=BPC-157", 200)
+            result2 = await self.run_test("Database Search - BPC-157", "GET", "search_bpc157", 200)
             return result2 is not None
         return False
 
-    def test_premium_checkout(self):
+    async def test_premium_checkout(self):
         """Test premium checkout creation (without actual payment)"""
         if not self.token:
             return False
             
-        checkout_data = {
-            "package_id": "premium_monthly",
-            "origin_url": "https://demobackend.emergentagent.com"
-        }
-        
-        result = self.run_test("Premium Checkout", "POST", "/api/payments/checkout", 200, checkout_data)
+        result = await self.run_test("Premium Checkout", "POST", "checkout", 200, CHECKOUT_PAYLOAD)
         return result is not None and 'url' in result
 
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Run all backend tests"""
         print("🐉 Starting Dr Ethergreen YKY Hub Backend Tests")
         print(f"🌐 Testing against: {self.base_url}")
         print("=" * 60)
         
-        # Core functionality tests
-        self.test_health_check()
-        
-        # Authentication tests
-        if self.test_user_registration():
-            self.test_user_login()
-            self.test_get_user_profile()
-            self.test_get_soulprint()
-            
-            # Feature tests (require authentication)
-            self.test_oracle_chat()
-            self.test_oracle_speak()
-            self.test_tarot_draw()
-            self.test_tarot_history()
-            self.test_community_post()
-            self.test_premium_checkout()
-        
-        # Public endpoint tests
-        self.test_community_feed()
-        self.test_database_search()
-        
-        # Print summary
-        print("=" * 60)
-        print(f"📊 Tests completed: {self.tests_passed}/{self.tests_run}")
-        success_rate = (self.tests_passed / self.tests_run * 100) if self.tests_run > 0 else 0
-        print(f"📈 Success rate: {success_rate:.1f}%")
-        
-        if self.tests_passed == self.tests_run:
-            print("🎉 All tests passed!")
-            return 0
-        else:
-            print("⚠️  Some tests failed. Check the details above.")
-            return 1
+        # Core functionality and public endpoint tests need no token, so
+        # they start right away and run alongside registration
+        public_tests = asyncio.gather(
+            self.test_health_check(),
+            self.test_community_feed(),
+            self.test_database_search(),
+        )
+
+        # Flush in finally so results logged so far still print if a test raises
+        try:
+            # Authentication tests; everything else only needs the token
+            # from registration, so the rest run concurrently
+            if await self.test_user_registration():
+                await asyncio.gather(
+                    self.test_user_login(),
+                    self.test_get_user_profile(),
+                    self.test_get_soulprint(),
+                    # Feature tests (require authentication)
+                    self.test_oracle_chat(),
+                    self.test_oracle_speak(),
+                    self.test_tarot_draw(),
+                    self.test_tarot_history(),
+                    self.test_community_post(),
+                    self.test_premium_checkout(),
+                )
+            await public_tests
+
+            # Summary
+            self._out.append("=" * 60)
+            self._out.append(f"📊 Tests completed: {self.tests_passed}/{self.tests_run}")
+            success_rate = (self.tests_passed / self.tests_run * 100) if self.tests_run > 0 else 0
+            self._out.append(f"📈 Success rate: {success_rate:.1f}%")
+
+            all_passed = self.tests_passed == self.tests_run
+            if all_passed:
+                self._out.append("🎉 All tests passed!")
+            else:
+                self._out.append("⚠️  Some tests failed. Check the details above.")
+            return 0 if all_passed else 1
+        finally:
+            self.flush_output()
 
-def main():
-    tester = YKYHubAPITester()
-    return tester.run_all_tests()
+async def main():
+    async with YKYHubAPITester() as tester:
+        return await tester.run_all_tests()
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(asyncio.run(main()))
\ No newline at end of file